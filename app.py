@@ -6,11 +6,17 @@ Gerçek zamanlı EEG veri akışı ve web arayüzü
 from flask import Flask, jsonify, render_template, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import json
+from werkzeug.serving import WSGIRequestHandler
+import logging
+import queue
 import threading
+from collections import deque
 import time
+import zlib
 from datetime import datetime
 import os
+import numpy as np
+import orjson
 
 # Kendi modüllerimizi import et
 from modules.eeg_simulator import EEGSimulator, MentalStateMode
@@ -18,11 +24,50 @@ from modules.signal_processor import SignalProcessor
 from modules.mental_state_classifier import MentalStateClassifier
 from modules.recommendation_engine import RecommendationEngine
 
+
+class OrjsonSerializer:
+    """
+    SocketIO için orjson tabanlı JSON arayüzü.
+    
+    SocketIO 'json' modülü gibi dumps/loads bekler ve str döndürülmesini
+    ister; orjson ise bytes üretir ve ek argüman kabul etmez.
+    """
+    
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
+
+class NoDelayRequestHandler(WSGIRequestHandler):
+    """
+    Kabul edilen her bağlantıda Nagle algoritmasını kapatan handler.
+    
+    Telemetri paketleri küçüktür; TCP_NODELAY olmadan çerçeveler
+    gecikmeli ACK ile birlikte ~40 ms bekleyebilir.
+    """
+    disable_nagle_algorithm = True
+
+
+# Geliştirme modu: EEG_DEBUG=1 ile reloader ve ayrıntılı loglar açılır
+DEBUG = os.environ.get('EEG_DEBUG') == '1'
+
 # Flask uygulaması oluştur
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'eeg-mental-tracker-secret-2024'
 CORS(app)  # Cross-Origin isteklerine izin ver
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Telemetri paketleri uygulamada bir kez sıkıştırılır (bkz. _emit_worker),
+# bu yüzden polling yanıtları için ayrıca gzip uygulanmaz.
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading',
+                    json=OrjsonSerializer, logger=DEBUG, engineio_logger=DEBUG,
+                    http_compression=False)
+
+if not DEBUG:
+    # Her polling isteği için erişim logu yazılmasın
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 # Global nesneler (tüm modüller)
 simulator = EEGSimulator(sampling_rate=256)
@@ -30,84 +75,141 @@ processor = SignalProcessor(sampling_rate=256, window_size_seconds=2.0)
 classifier = MentalStateClassifier()
 engine = RecommendationEngine()
 
+# Pencere ayarları (256 Hz * 2 s = 512 örnek, %50 örtüşme)
+WINDOW_SIZE = processor.window_size
+HOP_SIZE = WINDOW_SIZE // 2
+
+# Ham örnekler processor'ın pencere buffer'ında tutulur
+buffered = 0          # Analiz için bekleyen örnek sayısı
+last_timestamp = 0.0  # Buffer'daki son örneğin zaman damgası
+
+# Üretici → analiz thread'i el değiştirme
+window_ready = threading.Event()
+
+# Thread'ler arası paylaşılan durum için kilitler. GIL'e güvenmeden
+# (free-threaded CPython'da da) tutarlı okuma/yazma sağlar.
+_buf_lock = threading.Lock()      # Pencere buffer'ı, sayaçlar, is_streaming, current_mode
+_session_lock = threading.Lock()  # session_data ve running_sums
+
+# WebSocket gönderim kuyruğu (dolarsa en eski paket atılır)
+EMIT_QUEUE_SIZE = 4
+emit_queue = queue.Queue(maxsize=EMIT_QUEUE_SIZE)
+
+# Session geçmişi sınırı (saniyede 1 nokta → yaklaşık 2 saat)
+MAX_SESSION_POINTS = 7200
+
 # Global durum değişkenleri
-eeg_buffer = []  # Ham EEG örnekleri burda toplanır
-session_data = []  # Analiz sonuçları burda saklanır
+session_data = deque(maxlen=MAX_SESSION_POINTS)  # Analiz sonuçları burda saklanır
+running_sums = np.zeros(3, dtype=np.float64)  # Session'daki (stres, odak, uykusuzluk) toplamı
 current_mode = MentalStateMode.RELAXED  # Başlangıç modu
 is_streaming = False  # Akış aktif mi?
 
 
+def _record_session(packet: dict):
+    """
+    Paketi session geçmişine ekle ve ortalama toplamlarını güncelle.
+    
+    Geçmiş doluysa en eski paket düşer; toplamlardan önce onun
+    değerleri çıkarılır. Böylece ortalamalar O(1) hesaplanır.
+    """
+    if len(session_data) == MAX_SESSION_POINTS:
+        oldest = session_data[0]['mental_state']
+        running_sums[0] -= oldest['stress']
+        running_sums[1] -= oldest['focus']
+        running_sums[2] -= oldest['sleepiness']
+    
+    session_data.append(packet)
+    
+    state = packet['mental_state']
+    running_sums[0] += state['stress']
+    running_sums[1] += state['focus']
+    running_sums[2] += state['sleepiness']
+
+
+def _queue_packet(packet: dict):
+    """
+    Paketi gönderim kuyruğuna ekle.
+    
+    Kuyruk doluysa en eski paket atılır; telemetride en güncel veri
+    önemlidir ve üretici thread hiçbir zaman beklemez.
+    """
+    try:
+        emit_queue.put_nowait(packet)
+    except queue.Full:
+        try:
+            emit_queue.get_nowait()
+        except queue.Empty:
+            pass
+        emit_queue.put_nowait(packet)
+
+
+def _emit_worker():
+    """
+    Kuyruktaki paketleri WebSocket ile gönderen thread.
+    
+    Bekleyen tüm paketler tek bir 'eeg_update_gz' mesajında
+    birleştirilir, böylece yavaş istemciler akışı bloklamaz. Mesaj
+    JSON olarak bir kez serileştirilip zlib ile sıkıştırılır; tüm
+    istemcilere aynı sıkıştırılmış bytes gönderilir.
+    """
+    while True:
+        packets = [emit_queue.get()]
+        while True:
+            try:
+                packets.append(emit_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            payload = zlib.compress(orjson.dumps(packets), 1)
+            socketio.emit('eeg_update_gz', payload)
+        except Exception as e:
+            print(f"❌ Gönderim hatası: {e}")
+
+
 def background_eeg_stream():
     """
-    Arka planda sürekli çalışan EEG veri akışı.
+    Arka planda sürekli çalışan EEG veri akışı (üretici).
     
     Bu fonksiyon ayrı bir thread'de çalışır ve:
     1. Her 250ms'de simülatörden veri alır
-    2. Buffer dolduğunda analiz yapar
-    3. Sonuçları WebSocket ile frontend'e gönderir
+    2. Veriyi processor'ın pencere buffer'ına yazar
+    3. Pencere dolduğunda analiz thread'ine haber verir
+    
+    Analiz burada yapılmaz; böylece örnekleme zamanlaması analiz
+    süresinden etkilenmez.
     """
-    global eeg_buffer, session_data, current_mode, is_streaming
+    global buffered, last_timestamp
     
     print("🚀 EEG akışı başlatıldı...")
     
     while True:
-        if not is_streaming:
+        with _buf_lock:
+            streaming = is_streaming
+            mode = current_mode
+        
+        if not streaming:
             time.sleep(0.5)
             continue
         
         try:
             # 0.25 saniyelik veri üret (256 Hz * 0.25 = 64 örnek)
-            samples = list(simulator.stream_samples(current_mode, duration_seconds=0.25))
-            eeg_buffer.extend(samples)
+            timestamps, bands = simulator.generate_batch(mode, duration_seconds=0.25)
             
-            # 2 saniyelik pencere doldu mu kontrol et (256 Hz * 2 = 512 örnek)
-            if len(eeg_buffer) >= 512:
-                # === ANALİZ AŞAMASI ===
-                
-                # 1. Son 512 örneği al (2 saniye)
-                window_samples = eeg_buffer[-512:]
-                
-                # 2. Sinyal işleme: Band güçlerini hesapla
-                band_powers = processor.analyze_eeg_window(window_samples)
-                
-                # 3. Zihin durumu sınıflandır
-                mental_state = classifier.classify(band_powers)
-                
-                # 4. Öneriler üret
-                recommendations = engine.generate(mental_state)
+            with _buf_lock:
+                processor.push(bands)
+                last_timestamp = float(timestamps[-1])
+                buffered += len(bands)
                 
-                # === VERİ HAZIRLAMA ===
-                data_packet = {
-                    'timestamp': datetime.now().isoformat(),
-                    'band_powers': band_powers,
-                    'mental_state': {
-                        'stress': mental_state.stress_level,
-                        'focus': mental_state.focus_level,
-                        'sleepiness': mental_state.sleepiness_level,
-                        'confidence': mental_state.confidence
-                    },
-                    'recommendations': [
-                        {
-                            'type': rec.type.value,
-                            'frequency_hz': rec.frequency_hz,
-                            'duration_minutes': rec.duration_minutes,
-                            'title': rec.title,
-                            'description': rec.description,
-                            'priority': rec.priority
-                        } for rec in recommendations
-                    ],
-                    'current_mode': current_mode.value  # Debug için
-                }
-                
-                # === WEBSOCKET İLE GÖNDER ===
-                socketio.emit('eeg_update', data_packet)
-                
-                # Session'a kaydet
-                session_data.append(data_packet)
-                
-                # Buffer'ı temizle (overlap için 256 örnek bırak)
-                # Bu sayede pencereler kesintisiz devam eder
-                eeg_buffer = eeg_buffer[-256:]
+                # 2 saniyelik pencere doldu mu kontrol et (256 Hz * 2 = 512 örnek)
+                window_full = buffered >= WINDOW_SIZE
+                if window_full:
+                    # Overlap için 256 örneği beklemede bırak
+                    # Bu sayede pencereler kesintisiz devam eder
+                    buffered = HOP_SIZE
+            
+            if window_full:
+                window_ready.set()
             
             # 250ms bekle (4 Hz güncelleme hızı)
             time.sleep(0.25)
@@ -117,6 +219,66 @@ def background_eeg_stream():
             time.sleep(1)
 
 
+def _analysis_worker():
+    """
+    Hazır pencereleri analiz eden thread.
+    
+    Band güçlerini processor'ın pencere buffer'ından hesaplar,
+    sınıflandırır, öneri üretir ve sonucu gönderim kuyruğuna ekler.
+    
+    Not:
+        Analiz ayrı thread'de olduğu için süresi üreticinin 0.25 s'lik
+        uyku ritmine eklenmez. Çekirdekler GIL'i bırakmaz; bu ayrım
+        paralellik değil, zamanlama içindir.
+    """
+    while True:
+        window_ready.wait()
+        window_ready.clear()
+        
+        try:
+            # === ANALİZ AŞAMASI ===
+            
+            # 1-2. Son 512 örnekten (2 saniye) band güçlerini hesapla.
+            # Buffer üzerinde kopyasız tek indirgeme; kilit kısa süreli.
+            with _buf_lock:
+                band_powers = processor.analyze_eeg_window(timestamp=last_timestamp)
+                mode = current_mode
+            
+            # 3. Zihin durumu sınıflandır
+            mental_state = classifier.classify(band_powers)
+            
+            # 4. Öneriler üret
+            recommendations = engine.generate(mental_state)
+            
+            # === VERİ HAZIRLAMA ===
+            data_packet = {
+                'timestamp_ms': time.time_ns() // 1_000_000,  # Unix epoch (ms)
+                'band_powers': band_powers.to_dict(),
+                'mental_state': {
+                    'stress': mental_state.stress_level,
+                    'focus': mental_state.focus_level,
+                    'sleepiness': mental_state.sleepiness_level,
+                    'confidence': mental_state.confidence
+                },
+                'recommendations': [rec.payload for rec in recommendations],
+                'current_mode': mode.value  # Debug için
+            }
+            
+            # === WEBSOCKET İLE GÖNDER (kuyruk üzerinden) ===
+            # Öneriler hazır JSON parçaları olarak gömülür
+            _queue_packet({
+                **data_packet,
+                'recommendations': [rec.json_fragment for rec in recommendations]
+            })
+            
+            # Session'a kaydet
+            with _session_lock:
+                _record_session(data_packet)
+            
+        except Exception as e:
+            print(f"❌ Analiz hatası: {e}")
+
+
 # === FLASK ROUTE'LAR (HTTP Endpointler) ===
 
 @app.route('/')
@@ -128,12 +290,20 @@ def index():
 @app.route('/api/status')
 def api_status():
     """Sistem durumu"""
+    with _buf_lock:
+        streaming = is_streaming
+        mode = current_mode
+        buffer_size = buffered
+    
+    with _session_lock:
+        session_count = len(session_data)
+    
     return jsonify({
         'status': 'online',
-        'streaming': is_streaming,
-        'current_mode': current_mode.value,
-        'buffer_size': len(eeg_buffer),
-        'session_data_count': len(session_data)
+        'streaming': streaming,
+        'current_mode': mode.value,
+        'buffer_size': buffer_size,
+        'session_data_count': session_count
     })
 
 
@@ -152,14 +322,21 @@ def save_session():
         filename = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         filepath = os.path.join('data', filename)
         
-        # JSON'a yaz
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        # Anlık kopya al; yazma sırasında analiz thread'i beklemesin
+        with _session_lock:
+            snapshot = list(session_data)
+        
+        # JSON'a yaz (orjson her zaman UTF-8 üretir)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(
+                snapshot,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
         
         return jsonify({
             'status': 'success',
             'filename': filename,
-            'data_points': len(session_data)
+            'data_points': len(snapshot)
         })
     
     except Exception as e:
@@ -172,29 +349,32 @@ def save_session():
 @app.route('/api/session/clear', methods=['POST'])
 def clear_session():
     """Session verisini temizle"""
-    global session_data
-    session_data = []
+    with _session_lock:
+        session_data.clear()
+        running_sums[:] = 0.0
     return jsonify({'status': 'success', 'message': 'Session temizlendi'})
 
 
 @app.route('/api/session/stats')
 def session_stats():
     """Session istatistikleri"""
-    if not session_data:
+    with _session_lock:
+        count = len(session_data)
+        sums = running_sums.copy()
+    
+    if not count:
         return jsonify({'status': 'empty'})
     
-    # Ortalama değerleri hesapla
-    avg_stress = sum(d['mental_state']['stress'] for d in session_data) / len(session_data)
-    avg_focus = sum(d['mental_state']['focus'] for d in session_data) / len(session_data)
-    avg_sleepiness = sum(d['mental_state']['sleepiness'] for d in session_data) / len(session_data)
+    # Ortalama değerleri hesapla (tutulan toplamlardan, O(1))
+    avg_stress, avg_focus, avg_sleepiness = np.round(sums / count, 1).tolist()
     
     return jsonify({
-        'total_data_points': len(session_data),
-        'duration_seconds': len(session_data) * 2,  # Her nokta 2 saniye
+        'total_data_points': count,
+        'duration_seconds': count * 2,  # Her nokta 2 saniye
         'averages': {
-            'stress': round(avg_stress, 1),
-            'focus': round(avg_focus, 1),
-            'sleepiness': round(avg_sleepiness, 1)
+            'stress': avg_stress,
+            'focus': avg_focus,
+            'sleepiness': avg_sleepiness
         }
     })
 
@@ -205,10 +385,13 @@ def session_stats():
 def handle_connect():
     """İstemci bağlandığında"""
     print('✅ Client bağlandı')
+    with _buf_lock:
+        mode = current_mode
+    
     emit('connected', {
         'status': 'ready',
         'message': 'EEG Tracker hazır',
-        'current_mode': current_mode.value
+        'current_mode': mode.value
     })
 
 
@@ -222,7 +405,8 @@ def handle_disconnect():
 def handle_start_streaming():
     """Akışı başlat"""
     global is_streaming
-    is_streaming = True
+    with _buf_lock:
+        is_streaming = True
     print('▶️  Akış başlatıldı')
     emit('streaming_started', {'status': 'streaming'})
 
@@ -231,7 +415,8 @@ def handle_start_streaming():
 def handle_stop_streaming():
     """Akışı durdur"""
     global is_streaming
-    is_streaming = False
+    with _buf_lock:
+        is_streaming = False
     print('⏸️  Akış durduruldu')
     emit('streaming_stopped', {'status': 'stopped'})
 
@@ -257,12 +442,14 @@ def handle_mode_change(data):
     }
     
     if mode_str in mode_map:
-        current_mode = mode_map[mode_str]
-        print(f'🔄 Mode değiştirildi: {current_mode.value}')
+        mode = mode_map[mode_str]
+        with _buf_lock:
+            current_mode = mode
+        print(f'🔄 Mode değiştirildi: {mode.value}')
         
         emit('mode_changed', {
-            'mode': current_mode.value,
-            'message': f'Mod {current_mode.value} olarak değiştirildi'
+            'mode': mode.value,
+            'message': f'Mod {mode.value} olarak değiştirildi'
         }, broadcast=True)
     else:
         emit('error', {'message': 'Geçersiz mod'})
@@ -278,17 +465,31 @@ if __name__ == '__main__':
     print("📊 Örnekleme hızı: 256 Hz")
     print("⏱️  Pencere boyutu: 2 saniye")
     print("🔄 Güncelleme hızı: 4 Hz (0.25s)")
+    print(f"🛠️  Debug: {'açık' if DEBUG else 'kapalı'} (EEG_DEBUG=1)")
     print("="*60 + "\n")
     
+    # Numba çekirdeğini thread'ler başlamadan derle; ilk pencere
+    # analizi _buf_lock altında derleme beklemesin
+    processor.warmup()
+    
     # Arka plan thread'i başlat
     stream_thread = threading.Thread(target=background_eeg_stream, daemon=True)
     stream_thread.start()
     
+    # Analiz thread'i
+    analysis_thread = threading.Thread(target=_analysis_worker, daemon=True)
+    analysis_thread.start()
+    
+    # WebSocket gönderim thread'i
+    emit_thread = threading.Thread(target=_emit_worker, daemon=True)
+    emit_thread.start()
+    
     # Flask sunucusunu başlat
     socketio.run(
         app,
-        debug=True,
+        debug=DEBUG,
         host='0.0.0.0',
         port=5000,
+        request_handler=NoDelayRequestHandler,  # TCP_NODELAY
         allow_unsafe_werkzeug=True  # Geliştirme için
     )
\ No newline at end of file
@@ -6,7 +6,7 @@ Gerçekçi EEG sinyalleri simüle eder.
 import numpy as np
 from dataclasses import dataclass
 from enum import Enum
-from typing import Generator
+from typing import Dict, Generator, Tuple
 
 
 class MentalStateMode(Enum):
@@ -25,7 +25,15 @@ class EEGSample:
     """
     Tek bir zaman noktasındaki EEG ölçümü.
     Her dalga bandının güç değerini içerir (µV - mikrovolt).
+    
+    Not:
+        Akış ve analiz generate_batch ile üretilen (N, 5) dizileri
+        kullanır; bu sınıf tek tek örnek incelemek içindir.
+        __slots__ ile örnek başına __dict__ oluşturulmaz; alan okumaları
+        sabit ofsetten yapılır ve bellek kullanımı küçülür.
     """
+    __slots__ = ('timestamp', 'delta', 'theta', 'alpha', 'beta', 'gamma')
+    
     timestamp: float  # Saniye cinsinden zaman
     delta: float      # 0.5-4 Hz (derin uyku)
     theta: float      # 4-8 Hz (meditasyon, rüya)
@@ -34,6 +42,17 @@ class EEGSample:
     gamma: float      # 30-100 Hz (yoğun konsantrasyon)
 
 
+# Her mod için temel band güçleri: [delta, theta, alpha, beta, gamma]
+# RELAXED: Alpha dominant, FOCUSED: Beta ve Gamma yüksek,
+# STRESSED: Alpha düşük, Beta çok yüksek, SLEEPY: Delta ve Theta dominant
+_MODE_BASELINES: Dict[MentalStateMode, np.ndarray] = {
+    MentalStateMode.RELAXED: np.array([5.0, 8.0, 15.0, 5.0, 2.0], dtype=np.float32),
+    MentalStateMode.FOCUSED: np.array([3.0, 5.0, 7.0, 18.0, 8.0], dtype=np.float32),
+    MentalStateMode.STRESSED: np.array([4.0, 6.0, 4.0, 20.0, 12.0], dtype=np.float32),
+    MentalStateMode.SLEEPY: np.array([12.0, 10.0, 6.0, 3.0, 1.0], dtype=np.float32),
+}
+
+
 class EEGSimulator:
     """
     Gerçekçi EEG verisi üreten simülatör.
@@ -50,8 +69,18 @@ class EEGSimulator:
                           Genelde 256 Hz kullanılır.
         """
         self.sampling_rate = sampling_rate
-        self.time = 0.0
+        self.sample_idx = 0  # Üretilen toplam örnek sayısı
         self.current_mode = MentalStateMode.RELAXED
+        self._rng = np.random.default_rng()  # Simülatöre özel PCG64 üreteci
+    
+    @property
+    def time(self) -> float:
+        """
+        Saniye cinsinden simülasyon zamanı.
+        
+        Tam sayı örnek sayacından hesaplanır; float toplama kayması olmaz.
+        """
+        return self.sample_idx / self.sampling_rate
         
     def generate_sample(self, mode: MentalStateMode) -> EEGSample:
         """
@@ -68,54 +97,48 @@ class EEGSimulator:
             Bu gerçek EEG'nin doğal varyasyonunu simüle eder.
         """
         # Gerçekçi gürültü ekle (Gaussian noise)
-        noise = np.random.randn() * 0.5
+        noise = self._rng.standard_normal() * 0.5
         
-        if mode == MentalStateMode.RELAXED:
-            # Rahat durum: Alpha dominant
-            delta = 5 + noise
-            theta = 8 + noise
-            alpha = 15 + noise  # EN YÜKSEK
-            beta = 5 + noise
-            gamma = 2 + noise
-            
-        elif mode == MentalStateMode.FOCUSED:
-            # Odaklı durum: Beta ve Gamma yüksek
-            delta = 3 + noise
-            theta = 5 + noise
-            alpha = 7 + noise
-            beta = 18 + noise   # EN YÜKSEK
-            gamma = 8 + noise
-            
-        elif mode == MentalStateMode.STRESSED:
-            # Stresli durum: Alpha düşük, Beta çok yüksek
-            delta = 4 + noise
-            theta = 6 + noise
-            alpha = 4 + noise   # DÜŞÜK!
-            beta = 20 + noise   # ÇOK YÜKSEK
-            gamma = 12 + noise
-            
-        elif mode == MentalStateMode.SLEEPY:
-            # Uykulu durum: Delta ve Theta dominant
-            delta = 12 + noise  # EN YÜKSEK
-            theta = 10 + noise  # YÜKSEK
-            alpha = 6 + noise
-            beta = 3 + noise
-            gamma = 1 + noise
-            
-        else:
-            # Default: orta değerler
-            delta = theta = alpha = beta = gamma = 5 + noise
+        # Modun temel band güçleri (bkz. _MODE_BASELINES)
+        delta, theta, alpha, beta, gamma = _MODE_BASELINES[mode].tolist()
         
         # Negatif değerleri engelle (güç negatif olamaz)
         return EEGSample(
             timestamp=self.time,
-            delta=max(0.1, delta),
-            theta=max(0.1, theta),
-            alpha=max(0.1, alpha),
-            beta=max(0.1, beta),
-            gamma=max(0.1, gamma)
+            delta=max(0.1, delta + noise),
+            theta=max(0.1, theta + noise),
+            alpha=max(0.1, alpha + noise),
+            beta=max(0.1, beta + noise),
+            gamma=max(0.1, gamma + noise)
         )
     
+    def generate_batch(self, mode: MentalStateMode,
+                       duration_seconds: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Belirli bir süre için tüm örnekleri tek seferde üret.
+        
+        Args:
+            mode: Simüle edilecek zihin durumu
+            duration_seconds: Üretilecek veri süresi (saniye)
+            
+        Returns:
+            (timestamps, bands): (N,) zaman damgaları ve (N, 5) float32
+            band güçleri [delta, theta, alpha, beta, gamma]
+            
+        Not:
+            Gürültü tek bir RNG çağrısıyla üretilir; örnek başına Python
+            döngüsü yoktur. Her örnekte aynı gürültü tüm bantlara eklenir.
+        """
+        samples_count = int(self.sampling_rate * duration_seconds)
+        
+        noise = self._rng.standard_normal(samples_count, dtype=np.float32)
+        noise *= 0.5
+        bands = np.maximum(np.float32(0.1), _MODE_BASELINES[mode][None, :] + noise[:, None])
+        timestamps = (self.sample_idx + np.arange(samples_count)) / self.sampling_rate
+        
+        self.sample_idx += samples_count
+        return timestamps, bands
+    
     def stream_samples(self, mode: MentalStateMode, 
                       duration_seconds: float = 1.0) -> Generator[EEGSample, None, None]:
         """
@@ -132,11 +155,10 @@ class EEGSimulator:
             for sample in simulator.stream_samples(MentalStateMode.FOCUSED, 2.0):
                 print(sample)
         """
-        samples_count = int(self.sampling_rate * duration_seconds)
+        timestamps, bands = self.generate_batch(mode, duration_seconds)
         
-        for _ in range(samples_count):
-            yield self.generate_sample(mode)
-            self.time += 1.0 / self.sampling_rate
+        for ts, (delta, theta, alpha, beta, gamma) in zip(timestamps.tolist(), bands.tolist()):
+            yield EEGSample(ts, delta, theta, alpha, beta, gamma)
     
     def set_mode(self, mode: MentalStateMode):
         """Simülatörün aktif modunu değiştir."""
@@ -144,7 +166,7 @@ class EEGSimulator:
     
     def reset_time(self):
         """Zaman sayacını sıfırla."""
-        self.time = 0.0
+        self.sample_idx = 0
 
 
 # Test kodu (bu dosya direkt çalıştırılırsa)
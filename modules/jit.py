@@ -0,0 +1,21 @@
+"""
+JIT Module
+Numba kuruluysa sıcak fonksiyonları derler, değilse saf Python bırakır.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # Numba opsiyonel bağımlılık
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """
+        Numba yokken njit yerine geçen etkisiz dekoratör.
+
+        Hem @njit hem de @njit(cache=True, ...) kullanımını destekler.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
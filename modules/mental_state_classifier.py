@@ -3,8 +3,11 @@ Mental State Classifier Module
 EEG güç değerlerinden zihin durumu tespit eder.
 """
 
+import numpy as np
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Tuple, Union
+
+from modules.jit import njit
 
 
 @dataclass
@@ -38,55 +41,30 @@ class MentalStateClassifier:
         self.focus_beta_min = 12.0
         self.sleepy_delta_threshold = 10.0
         
-    def classify(self, band_powers: Dict[str, float]) -> MentalState:
+    def classify(self, band_powers: Union[Tuple[float, ...], Dict[str, float]]) -> MentalState:
         """
         Band güçlerinden zihin durumu çıkar.
         
         Args:
-            band_powers: Signal processor'dan gelen güç değerleri
+            band_powers: Signal processor'dan gelen BandPowers veya
+                         eski sözlük biçimi (*_power anahtarları)
             
         Returns:
             MentalState: Stres, odak, uykusuzluk seviyeleri
         """
-        delta = band_powers['delta_power']
-        theta = band_powers['theta_power']
-        alpha = band_powers['alpha_power']
-        beta = band_powers['beta_power']
-        gamma = band_powers['gamma_power']
-        
-        # Toplam güç
-        total_power = delta + theta + alpha + beta + gamma
-        
-        if total_power < 1.0:
-            # Çok düşük sinyal
-            return MentalState(
-                stress_level=0,
-                focus_level=0,
-                sleepiness_level=0,
-                confidence=0.0
+        if isinstance(band_powers, dict):
+            powers = (
+                band_powers['delta_power'],
+                band_powers['theta_power'],
+                band_powers['alpha_power'],
+                band_powers['beta_power'],
+                band_powers['gamma_power']
             )
+        else:
+            # BandPowers: ilk beş alan [delta, theta, alpha, beta, gamma]
+            powers = band_powers[:5]
         
-        # Her bandın yüzdesi
-        delta_pct = (delta / total_power) * 100
-        theta_pct = (theta / total_power) * 100
-        alpha_pct = (alpha / total_power) * 100
-        beta_pct = (beta / total_power) * 100
-        gamma_pct = (gamma / total_power) * 100
-        
-        # === STRES HESAPLAMA ===
-        # Yüksek beta + düşük alpha = stres
-        stress = self._calculate_stress(beta_pct, alpha_pct, gamma_pct)
-        
-        # === ODAK HESAPLAMA ===
-        # Orta-yüksek beta + gamma
-        focus = self._calculate_focus(beta_pct, gamma_pct, alpha_pct)
-        
-        # === UYKUSUZLUK HESAPLAMA ===
-        # Yüksek delta + theta
-        sleepiness = self._calculate_sleepiness(delta_pct, theta_pct, beta_pct)
-        
-        # Güven skoru
-        confidence = self._calculate_confidence(total_power)
+        stress, focus, sleepiness, confidence = _classify_kernel(*powers)
         
         return MentalState(
             stress_level=stress,
@@ -95,82 +73,190 @@ class MentalStateClassifier:
             confidence=confidence
         )
     
-    def _calculate_stress(self, beta_pct: float, alpha_pct: float, 
-                         gamma_pct: float) -> int:
-        """
-        Stres seviyesi hesapla.
-        
-        Formül: Yüksek Beta - Düşük Alpha + Yüksek Gamma
+    def classify_batch(self, band_powers: np.ndarray) -> np.ndarray:
         """
-        # Beta çok yüksekse stres artar
-        stress_from_beta = min(100, beta_pct * 3)
+        Çok sayıda pencereyi tek seferde sınıflandır.
         
-        # Alpha düşükse stres artar
-        stress_from_alpha = max(0, 50 - alpha_pct * 2)
+        classify ile aynı kuralları dallanmasız NumPy ifadeleriyle
+        uygular; session verisinin toplu yeniden analizi için.
         
-        # Gamma çok yüksekse stres işareti
-        stress_from_gamma = min(30, gamma_pct * 2)
-        
-        total_stress = (stress_from_beta + stress_from_alpha + stress_from_gamma) / 2.5
-        
-        return int(min(100, max(0, total_stress)))
-    
-    def _calculate_focus(self, beta_pct: float, gamma_pct: float,
-                        alpha_pct: float) -> int:
-        """
-        Odak seviyesi hesapla.
-        
-        Formül: Orta Beta + Gamma + Biraz Alpha
+        Args:
+            band_powers: (B, 5) dizi [delta, theta, alpha, beta, gamma]
+            
+        Returns:
+            (B, 4) dizi: stres, odak, uykusuzluk, güven
         """
-        # Beta 20-35% arasında optimum odak
-        if 20 <= beta_pct <= 35:
-            focus_from_beta = 60
-        elif beta_pct > 35:
-            focus_from_beta = min(100, beta_pct * 2)
-        else:
-            focus_from_beta = beta_pct * 2
+        powers = np.asarray(band_powers, dtype=np.float64)
+        total_power = powers.sum(axis=1)
+        valid = total_power >= 1.0
         
-        # Gamma katkısı
-        focus_from_gamma = min(40, gamma_pct * 3)
+        # Her bandın yüzdesi (geçersiz satırlarda sıfıra bölme olmasın)
+        pct = powers * (100.0 / np.where(valid, total_power, 1.0))[:, None]
+        delta_pct, theta_pct, alpha_pct, beta_pct, gamma_pct = pct.T
         
-        # Çok fazla alpha odağı bozabilir
-        alpha_penalty = max(0, (alpha_pct - 30) * 0.5)
+        # === STRES ===
+        stress = (np.minimum(100, beta_pct * 3) +
+                  np.maximum(0, 50 - alpha_pct * 2) +
+                  np.minimum(30, gamma_pct * 2)) / 2.5
         
-        total_focus = focus_from_beta + focus_from_gamma - alpha_penalty
+        # === ODAK ===
+        focus_from_beta = np.where(
+            (beta_pct >= 20) & (beta_pct <= 35), 60.0,
+            np.where(beta_pct > 35, np.minimum(100, beta_pct * 2), beta_pct * 2)
+        )
+        focus = (focus_from_beta + np.minimum(40, gamma_pct * 3) -
+                 np.maximum(0, (alpha_pct - 30) * 0.5))
         
-        return int(min(100, max(0, total_focus)))
-    
-    def _calculate_sleepiness(self, delta_pct: float, theta_pct: float,
-                             beta_pct: float) -> int:
-        """
-        Uykusuzluk seviyesi hesapla.
+        # === UYKUSUZLUK ===
+        sleepiness = (delta_pct * 2 + theta_pct * 1.5) / 2 + np.maximum(0, 30 - beta_pct)
         
-        Formül: Yüksek Delta + Theta - Beta
-        """
-        # Delta ve Theta yüksekse uykusuzluk
-        sleepy_from_slow = (delta_pct * 2 + theta_pct * 1.5) / 2
+        # Güven skoru
+        confidence = np.select(
+            [total_power > 30, total_power > 20, total_power > 10],
+            [0.9, 0.7, 0.5],
+            default=0.3
+        )
         
-        # Beta düşükse uykusuzluk artar
-        beta_penalty = max(0, 30 - beta_pct)
+        result = np.empty((len(powers), 4))
+        result[:, 0] = np.trunc(np.clip(stress, 0, 100))
+        result[:, 1] = np.trunc(np.clip(focus, 0, 100))
+        result[:, 2] = np.trunc(np.clip(sleepiness, 0, 100))
+        result[:, 3] = confidence
         
-        total_sleepiness = sleepy_from_slow + beta_penalty
+        # Çok düşük sinyal
+        result[~valid] = 0.0
         
-        return int(min(100, max(0, total_sleepiness)))
+        return result
+
+
+@njit(cache=True, fastmath=True)
+def _calculate_stress(beta_pct: float, alpha_pct: float,
+                      gamma_pct: float) -> int:
+    """
+    Stres seviyesi hesapla.
     
-    def _calculate_confidence(self, total_power: float) -> float:
-        """
-        Tahmin güvenilirliği hesapla.
-        
-        Yüksek toplam güç = yüksek güven
-        """
-        if total_power > 30:
-            return 0.9
-        elif total_power > 20:
-            return 0.7
-        elif total_power > 10:
-            return 0.5
-        else:
-            return 0.3
+    Formül: Yüksek Beta - Düşük Alpha + Yüksek Gamma
+    """
+    # Beta çok yüksekse stres artar
+    stress_from_beta = min(100, beta_pct * 3)
+    
+    # Alpha düşükse stres artar
+    stress_from_alpha = max(0, 50 - alpha_pct * 2)
+    
+    # Gamma çok yüksekse stres işareti
+    stress_from_gamma = min(30, gamma_pct * 2)
+    
+    total_stress = (stress_from_beta + stress_from_alpha + stress_from_gamma) / 2.5
+    
+    return int(min(100, max(0, total_stress)))
+
+
+@njit(cache=True, fastmath=True)
+def _calculate_focus(beta_pct: float, gamma_pct: float,
+                     alpha_pct: float) -> int:
+    """
+    Odak seviyesi hesapla.
+    
+    Formül: Orta Beta + Gamma + Biraz Alpha
+    """
+    # Beta 20-35% arasında optimum odak
+    if 20 <= beta_pct <= 35:
+        focus_from_beta = 60
+    elif beta_pct > 35:
+        focus_from_beta = min(100, beta_pct * 2)
+    else:
+        focus_from_beta = beta_pct * 2
+    
+    # Gamma katkısı
+    focus_from_gamma = min(40, gamma_pct * 3)
+    
+    # Çok fazla alpha odağı bozabilir
+    alpha_penalty = max(0, (alpha_pct - 30) * 0.5)
+    
+    total_focus = focus_from_beta + focus_from_gamma - alpha_penalty
+    
+    return int(min(100, max(0, total_focus)))
+
+
+@njit(cache=True, fastmath=True)
+def _calculate_sleepiness(delta_pct: float, theta_pct: float,
+                          beta_pct: float) -> int:
+    """
+    Uykusuzluk seviyesi hesapla.
+    
+    Formül: Yüksek Delta + Theta - Beta
+    """
+    # Delta ve Theta yüksekse uykusuzluk
+    sleepy_from_slow = (delta_pct * 2 + theta_pct * 1.5) / 2
+    
+    # Beta düşükse uykusuzluk artar
+    beta_penalty = max(0, 30 - beta_pct)
+    
+    total_sleepiness = sleepy_from_slow + beta_penalty
+    
+    return int(min(100, max(0, total_sleepiness)))
+
+
+@njit(cache=True, fastmath=True)
+def _calculate_confidence(total_power: float) -> float:
+    """
+    Tahmin güvenilirliği hesapla.
+    
+    Yüksek toplam güç = yüksek güven
+    """
+    if total_power > 30:
+        return 0.9
+    elif total_power > 20:
+        return 0.7
+    elif total_power > 10:
+        return 0.5
+    else:
+        return 0.3
+
+
+@njit(cache=True, fastmath=True)
+def _classify_kernel(delta: float, theta: float, alpha: float,
+                     beta: float, gamma: float):
+    """
+    classify'ın sayısal çekirdeği.
+    
+    Numba varsa makine koduna derlenir; 4 Hz akışta her pencere için
+    Python yorumlayıcısına hiç uğramaz.
+    
+    Returns:
+        (stres, odak, uykusuzluk, güven)
+    """
+    # Toplam güç
+    total_power = delta + theta + alpha + beta + gamma
+    
+    if total_power < 1.0:
+        # Çok düşük sinyal
+        return 0, 0, 0, 0.0
+    
+    # Her bandın yüzdesi (tek bölme, beş çarpma)
+    pct_scale = 100.0 / total_power
+    delta_pct = delta * pct_scale
+    theta_pct = theta * pct_scale
+    alpha_pct = alpha * pct_scale
+    beta_pct = beta * pct_scale
+    gamma_pct = gamma * pct_scale
+    
+    # === STRES HESAPLAMA ===
+    # Yüksek beta + düşük alpha = stres
+    stress = _calculate_stress(beta_pct, alpha_pct, gamma_pct)
+    
+    # === ODAK HESAPLAMA ===
+    # Orta-yüksek beta + gamma
+    focus = _calculate_focus(beta_pct, gamma_pct, alpha_pct)
+    
+    # === UYKUSUZLUK HESAPLAMA ===
+    # Yüksek delta + theta
+    sleepiness = _calculate_sleepiness(delta_pct, theta_pct, beta_pct)
+    
+    # Güven skoru
+    confidence = _calculate_confidence(total_power)
+    
+    return stress, focus, sleepiness, confidence
 
 
 # Test kodu
@@ -190,10 +276,10 @@ if __name__ == "__main__":
         print("-" * 60)
         
         # 2 saniye veri üret
-        samples = list(simulator.stream_samples(mode, duration_seconds=2.0))
+        timestamps, bands = simulator.generate_batch(mode, duration_seconds=2.0)
         
         # İşle
-        band_powers = processor.analyze_eeg_window(samples)
+        band_powers = processor.analyze_eeg_window(bands, timestamp=float(timestamps[-1]))
         mental_state = classifier.classify(band_powers)
         
         # Sonuçları göster
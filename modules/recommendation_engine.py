@@ -5,10 +5,19 @@ Zihin durumuna göre kişiselleştirilmiş öneriler üretir.
 
 from enum import Enum
 from dataclasses import dataclass
-from typing import List
+from functools import cached_property, lru_cache
+from operator import attrgetter
+from typing import List, Tuple
+
+import orjson
+
 from modules.mental_state_classifier import MentalState
 
 
+# Öncelik sıralama anahtarı (C seviyesinde öznitelik okuma)
+_by_priority = attrgetter('priority')
+
+
 class RecommendationType(Enum):
     """Öneri türleri"""
     BINAURAL_BEATS = "binaural_beats"  # Frekans bazlı müzik
@@ -28,6 +37,33 @@ class Recommendation:
     title: str = ""
     description: str = ""
     priority: int = 1           # 1=yüksek, 3=düşük
+    
+    @cached_property
+    def payload(self) -> dict:
+        """
+        JSON'a hazır sözlük hali.
+        
+        Öneriler sabit olduğu için bir kez oluşturulur ve her pakette
+        aynı sözlük tekrar kullanılır. Değiştirilmemelidir.
+        """
+        return {
+            'type': self.type.value,
+            'frequency_hz': self.frequency_hz,
+            'duration_minutes': self.duration_minutes,
+            'title': self.title,
+            'description': self.description,
+            'priority': self.priority
+        }
+    
+    @cached_property
+    def json_fragment(self) -> orjson.Fragment:
+        """
+        Önceden serileştirilmiş JSON parçası.
+        
+        orjson ile gönderilen paketlere olduğu gibi gömülür; başlık ve
+        açıklama metinleri her pakette yeniden kodlanmaz.
+        """
+        return orjson.Fragment(orjson.dumps(self.payload))
 
 
 class RecommendationEngine:
@@ -52,6 +88,15 @@ class RecommendationEngine:
         self.low_focus_threshold = 40
         self.high_sleepiness_threshold = 70
         
+        # Öneri listeleri sabittir: bir kez oluşturup tekrar kullan
+        self._stress = tuple(self._stress_recommendations())
+        self._focus = tuple(self._focus_recommendations())
+        self._sleepiness = tuple(self._sleepiness_recommendations())
+        self._maintenance = tuple(self._maintenance_recommendations())
+        
+        # En fazla 16 farklı durum kombinasyonu var
+        self._combine = lru_cache(maxsize=16)(self._combine_recommendations)
+        
     def generate(self, mental_state: MentalState) -> List[Recommendation]:
         """
         Zihin durumuna göre öneri listesi oluştur.
@@ -62,30 +107,50 @@ class RecommendationEngine:
         Returns:
             List[Recommendation]: Öncelik sırasına göre öneriler
         """
-        recommendations = []
-        
         # STRES YÜKSEK
-        if mental_state.stress_level > self.high_stress_threshold:
-            recommendations.extend(self._stress_recommendations())
+        high_stress = mental_state.stress_level > self.high_stress_threshold
         
         # ODAK DÜŞÜK
-        if mental_state.focus_level < self.low_focus_threshold:
-            recommendations.extend(self._focus_recommendations())
+        low_focus = mental_state.focus_level < self.low_focus_threshold
         
         # UYKUSUZLUK YÜKSEK
-        if mental_state.sleepiness_level > self.high_sleepiness_threshold:
-            recommendations.extend(self._sleepiness_recommendations())
+        high_sleepiness = mental_state.sleepiness_level > self.high_sleepiness_threshold
         
         # ORTA SEVİYE (her şey normal)
-        if (self.low_focus_threshold <= mental_state.focus_level <= 70 and
-            mental_state.stress_level < self.high_stress_threshold and
-            mental_state.sleepiness_level < self.high_sleepiness_threshold):
-            recommendations.extend(self._maintenance_recommendations())
+        normal = (self.low_focus_threshold <= mental_state.focus_level <= 70 and
+                  mental_state.stress_level < self.high_stress_threshold and
+                  mental_state.sleepiness_level < self.high_sleepiness_threshold)
+        
+        return list(self._combine(high_stress, low_focus, high_sleepiness, normal))
+    
+    def _combine_recommendations(self, high_stress: bool, low_focus: bool,
+                                 high_sleepiness: bool,
+                                 normal: bool) -> Tuple[Recommendation, ...]:
+        """
+        Aktif durumlara ait hazır önerileri birleştir ve sırala.
+        
+        Sonuç durum kombinasyonuna göre önbelleğe alınır; ardışık
+        pencereler genelde aynı kombinasyona düştüğü için sıralama
+        neredeyse hiç tekrarlanmaz.
+        """
+        recommendations = []
+        
+        if high_stress:
+            recommendations.extend(self._stress)
+        
+        if low_focus:
+            recommendations.extend(self._focus)
+        
+        if high_sleepiness:
+            recommendations.extend(self._sleepiness)
+        
+        if normal:
+            recommendations.extend(self._maintenance)
         
         # Önceliğe göre sırala
-        recommendations.sort(key=lambda x: x.priority)
+        recommendations.sort(key=_by_priority)
         
-        return recommendations
+        return tuple(recommendations)
     
     def _stress_recommendations(self) -> List[Recommendation]:
         """Stres için öneriler."""
@@ -3,9 +3,148 @@ Signal Processor Module
 EEG sinyallerini işler ve frekans analizi yapar.
 """
 
+import warnings
 import numpy as np
-from typing import List, Dict
+import scipy.fft
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
+from typing import List, Dict, NamedTuple, Optional, Tuple, Union
 from modules.eeg_simulator import EEGSample
+from modules.jit import NUMBA_AVAILABLE, njit, prange
+
+
+# Band güçlerinin sabit sırası
+_BAND_KEYS = ('delta_power', 'theta_power', 'alpha_power', 'beta_power', 'gamma_power')
+
+# Frekans bantları (Hz), _BAND_KEYS sırasıyla: [alt, üst)
+_BAND_RANGES = ((0.5, 4.0), (4.0, 8.0), (8.0, 13.0), (13.0, 30.0), (30.0, 100.0))
+
+# Bu eleman sayısının (satır × band) üstünde paralel indirgeme kullanılır
+_PARALLEL_MIN_ELEMENTS = 4096
+
+# Oran önbelleği için anahtar hassasiyeti (ondalık basamak, µV)
+_RATIO_KEY_DECIMALS = 3
+
+
+class BandPowers(NamedTuple):
+    """
+    Bir analiz penceresinin band güçleri (µV) ve zaman damgası.
+    
+    Alan sırası _BAND_KEYS ile aynıdır; ilk beş alan doğrudan
+    tuple olarak açılabilir.
+    """
+    delta: float
+    theta: float
+    alpha: float
+    beta: float
+    gamma: float
+    timestamp: float
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Eski sözlük biçimi (frontend JSON ve kayıtlı session'lar için)."""
+        return {
+            'delta_power': self.delta,
+            'theta_power': self.theta,
+            'alpha_power': self.alpha,
+            'beta_power': self.beta,
+            'gamma_power': self.gamma,
+            'timestamp': self.timestamp
+        }
+
+
+# Boş pencere sonucu: değişmez tek örnek, her çağrıda yeniden oluşturulmaz
+_EMPTY_BP = BandPowers(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+@lru_cache(maxsize=1024)
+def _ratios_from_powers(delta: float, theta: float, alpha: float,
+                        beta: float, gamma: float) -> Optional[Tuple[float, float, float]]:
+    """
+    Yuvarlanmış band güçlerinden oranları hesapla (önbellekli).
+    
+    Returns:
+        (beta/alpha, theta/beta, toplam güç) veya toplam güç 0 ise None
+    """
+    total_power = delta + theta + alpha + beta + gamma
+    
+    if total_power == 0:
+        return None
+    
+    # Güvenli bölme: alpha ve beta tek vektör işlemiyle alttan sınırlanır
+    alpha, beta = np.maximum(np.array([alpha, beta]), 0.1).tolist()
+    
+    return beta / alpha, theta / beta, total_power
+
+
+@njit(cache=True, fastmath=True)
+def _band_means(bands: np.ndarray) -> np.ndarray:
+    """
+    (N, 5) band dizisinin sütun ortalamaları.
+    
+    Numba ile tek geçişte vektörleştirilmiş bir döngüye derlenir.
+    """
+    out = np.zeros(5, dtype=np.float32)
+    for i in range(bands.shape[0]):
+        for j in range(5):
+            out[j] += bands[i, j]
+    return out * np.float32(1.0 / bands.shape[0])
+
+
+@njit(cache=True)
+def _quantized_band_sums(buf: np.ndarray) -> np.ndarray:
+    """
+    (N, 5) int16 buffer'ın sütun toplamları (int64 birikimli).
+    """
+    out = np.zeros(5, dtype=np.int64)
+    for i in range(buf.shape[0]):
+        for j in range(5):
+            out[j] += buf[i, j]
+    return out
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _band_sums_par(arr: np.ndarray) -> np.ndarray:
+    """
+    (N, 5) dizinin sütun toplamları, her band ayrı iş parçacığında.
+    
+    int16 buffer ve float32 dizilerle çalışır (float64 birikimli).
+    Büyük pencerelerde indirgeme birden çok çekirdeğe dağılır.
+    """
+    out = np.zeros(5, dtype=np.float64)
+    for j in prange(5):
+        s = 0.0
+        for i in range(arr.shape[0]):
+            s += arr[i, j]
+        out[j] = s
+    return out
+
+
+@lru_cache(maxsize=None)
+def _make_window_kernel(window_size: int):
+    """
+    Pencere boyutuna özel, tam dolu buffer için toplam çekirdeği üret.
+    
+    window_size kapanış (closure) değişkeni olarak Numba'ya derleme
+    zamanı sabiti olur; sabit döngü sınırıyla LLVM açma/vektörleştirme
+    yapabilir. İmza verildiği için derleme burada yapılır; sonuç her
+    window_size için bir kez üretilip paylaşılır.
+    
+    Returns:
+        Derlenmiş çekirdek, Numba yoksa None
+    """
+    if not NUMBA_AVAILABLE:
+        return None
+    
+    @njit('int64[:](int16[:, ::1])')
+    def kernel(buf):
+        out = np.zeros(5, dtype=np.int64)
+        for i in range(window_size):
+            for j in range(5):
+                out[j] += buf[i, j]
+        return out
+    
+    return kernel
 
 
 class SignalProcessor:
@@ -17,7 +156,13 @@ class SignalProcessor:
     2. Her dalga bandının ortalama gücünü hesaplar
     3. Temiz veri çıktısı sağlar
     
-    İleri seviye: FFT (Fast Fourier Transform) ile frekans analizi yapılabilir.
+    İleri seviye: Ham sinyal için FFT (Fast Fourier Transform) ile frekans
+    analizi analyze_eeg_window_fft ile yapılır.
+    
+    Not:
+        push ile akış buffer'ına yazılan band değerleri int16 (µV×1000)
+        saklanır; geçerli aralık ±32.767 µV'dur. Aralık dışı değerler
+        kırpılır ve uyarı verilir.
     """
     
     def __init__(self, sampling_rate: int = 256, window_size_seconds: float = 2.0):
@@ -29,52 +174,216 @@ class SignalProcessor:
         self.sampling_rate = sampling_rate
         self.window_size = int(sampling_rate * window_size_seconds)
         
-    def analyze_eeg_window(self, samples: List[EEGSample]) -> Dict[str, float]:
+        # Akış için sabit boyutlu pencere buffer'ı: (window_size, 5) halka.
+        # Değerler µV×1000 ölçeğiyle int16 saklanır (±32.767 µV aralığı);
+        # ortalama indirgemesinde taşınan bayt sayısı yarıya iner
+        self._scale = 1000.0
+        self._buf = np.zeros((self.window_size, 5), dtype=np.int16)
+        
+        # Tam pencere için window_size'a özelleştirilmiş çekirdek; warmup()
+        # ile ya da ilk tam pencere indirgemesinde derlenir (buffer
+        # kullanmayan örnekler derleme maliyeti ödemez)
+        self._window_kernel = None
+        
+        # Büyük pencerelerde (örn. çok saniyelik) paralel indirgeme
+        self._use_parallel = NUMBA_AVAILABLE and self.window_size * 5 > _PARALLEL_MIN_ELEMENTS
+        self._idx = 0  # Buffer'a yazılan toplam örnek sayısı
+        
+        # Tam pencere ortalaması için ağırlık vektörü: (1/N, ..., 1/N)
+        self._avg_weights = np.full(self.window_size, 1.0 / self.window_size, dtype=np.float32)
+        
+        # EEGSample'dan beş band değerini tek C çağrısında tuple olarak okur
+        self._band_getter = attrgetter('delta', 'theta', 'alpha', 'beta', 'gamma')
+        
+        # FFT yolu için bir kez hazırlanan Hann penceresi, frekans ekseni
+        # ve band maskeleri (her pencerede yeniden oluşturulmaz)
+        self._window = np.hanning(self.window_size).astype(np.float32)
+        self._freqs = np.fft.rfftfreq(self.window_size, 1.0 / sampling_rate)
+        self._band_masks = tuple(
+            (self._freqs >= low) & (self._freqs < high) for low, high in _BAND_RANGES
+        )
+        
+        # Band başına 1/bin sayısı. Kısa pencerede hiç bin düşmeyen bandın
+        # katsayısı 0 olur; o band NaN yerine 0.0 güç verir
+        bin_counts = np.array([mask.sum() for mask in self._band_masks], dtype=np.float64)
+        self._band_inv_counts = np.divide(
+            1.0, bin_counts, out=np.zeros(5), where=bin_counts > 0
+        )
+    
+    def push(self, bands: np.ndarray):
+        """
+        Yeni örnekleri pencere buffer'ına yaz (en eskilerin üzerine).
+        
+        Args:
+            bands: (N, 5) band dizisi [delta, theta, alpha, beta, gamma]
+            
+        Not:
+            Değerler int16'ya (µV×1000) nicemlenir. Geçerli aralık
+            ±32.767 µV'dur; aralık dışı değerler kırpılır ve
+            RuntimeWarning verilir.
+        """
+        n = len(bands)
+        size = self.window_size
+        
+        # Pencereden uzun girişte sadece son window_size örnek kalır
+        if n > size:
+            self._idx += n - size
+            bands = bands[-size:]
+            n = size
+        
+        # µV → int16 (µV×1000), yuvarlama ve doyurma ile
+        scaled = np.rint(bands * self._scale)
+        if n and (scaled.max() > 32767 or scaled.min() < -32768):
+            warnings.warn(
+                f"Band değerleri int16 aralığı dışında (±{32767 / self._scale:.3f} µV); kırpıldı",
+                RuntimeWarning,
+                stacklevel=2
+            )
+        bands = np.clip(scaled, -32768, 32767).astype(np.int16)
+        
+        start = self._idx % size
+        first = min(n, size - start)
+        self._buf[start:start + first] = bands[:first]
+        self._buf[:n - first] = bands[first:]
+        
+        self._idx += n
+    
+    def warmup(self):
+        """
+        Pencereye özel Numba çekirdeğini önceden derle.
+        
+        Not:
+            Akış thread'leri başlamadan çağrılmalıdır; aksi halde derleme
+            (~0.5 s) ilk tam pencere analizinde, çağıranın tuttuğu kilit
+            altında yapılır. Numba yoksa bir şey yapmaz.
+        """
+        if NUMBA_AVAILABLE and self._window_kernel is None:
+            self._window_kernel = _make_window_kernel(self.window_size)
+    
+    def snapshot(self) -> np.ndarray:
+        """Buffer'daki örnekleri zaman sırasıyla (µV, float32 kopya) döndür."""
+        if self._idx < self.window_size:
+            ordered = self._buf[:self._idx]
+        else:
+            head = self._idx % self.window_size
+            ordered = np.concatenate((self._buf[head:], self._buf[:head]))
+        
+        return ordered.astype(np.float32) * np.float32(1.0 / self._scale)
+        
+    def analyze_eeg_window(self, samples: Optional[Union[List[EEGSample], np.ndarray]] = None,
+                           timestamp: Optional[float] = None) -> BandPowers:
         """
         Bir pencere dolusu EEG verisini analiz et.
         
         Args:
-            samples: EEGSample listesi
+            samples: EEGSample listesi veya (N, 5) band dizisi
+                     [delta, theta, alpha, beta, gamma]. Verilmezse
+                     push ile doldurulan pencere buffer'ı kullanılır.
+            timestamp: Pencerenin zaman damgası. Liste verilirse son
+                       örneğin zamanı kullanılır.
             
         Returns:
-            Her dalga bandının güç değeri ve zaman damgası
+            BandPowers: Her dalga bandının güç değeri ve zaman damgası
             
         Not:
             Bu basitleştirilmiş versiyonda sadece ortalama alıyoruz.
-            İleri seviyede FFT ile gerçek frekans analizi yapılabilir.
+            Ham sinyalde gerçek frekans analizi için analyze_eeg_window_fft.
         """
-        if not samples:
+        if samples is None:
+            # Ortalama sıra bağımsızdır: halka buffer kopyasız kullanılır
+            n = min(self._idx, self.window_size)
+            if n == 0:
+                return self._empty_result()
+            
+            # int16 buffer int64'te toplanır, ölçek tek çarpımla geri alınır
+            buf = self._buf[:n]
+            if self._use_parallel:
+                sums = _band_sums_par(buf)
+            elif NUMBA_AVAILABLE and n == self.window_size:
+                if self._window_kernel is None:
+                    self._window_kernel = _make_window_kernel(self.window_size)
+                sums = self._window_kernel(self._buf)
+            elif NUMBA_AVAILABLE:
+                sums = _quantized_band_sums(buf)
+            else:
+                sums = buf.sum(axis=0, dtype=np.int64)
+            powers = sums.astype(np.float32) * np.float32(1.0 / (self._scale * n))
+            return self._build_result(powers, timestamp)
+        
+        if len(samples) == 0:
             return self._empty_result()
         
-        # Her kanal için veriyi ayır
-        delta_samples = [s.delta for s in samples]
-        theta_samples = [s.theta for s in samples]
-        alpha_samples = [s.alpha for s in samples]
-        beta_samples = [s.beta for s in samples]
-        gamma_samples = [s.gamma for s in samples]
+        if isinstance(samples, np.ndarray):
+            bands = samples
+        else:
+            # EEGSample listesini tek seferde (N, 5) diziye çevir;
+            # map + attrgetter + chain döngüsü tamamen C katmanında çalışır
+            bands = np.fromiter(
+                chain.from_iterable(map(self._band_getter, samples)),
+                dtype=np.float32,
+                count=5 * len(samples)
+            ).reshape(-1, 5)
+            
+            if timestamp is None:
+                timestamp = samples[-1].timestamp
         
-        # Basit ortalama güç hesabı
-        return {
-            'delta_power': float(np.mean(delta_samples)),
-            'theta_power': float(np.mean(theta_samples)),
-            'alpha_power': float(np.mean(alpha_samples)),
-            'beta_power': float(np.mean(beta_samples)),
-            'gamma_power': float(np.mean(gamma_samples)),
-            'timestamp': samples[-1].timestamp
-        }
+        # Basit ortalama güç hesabı: tüm bantlar tek indirgemede.
+        # Numba varsa derlenmiş çekirdek (büyük dizide paralel), yoksa
+        # tam pencerede tek bir BLAS GEMV çağrısı (ağırlıklar @ bantlar)
+        if NUMBA_AVAILABLE and bands.size > _PARALLEL_MIN_ELEMENTS:
+            powers = (_band_sums_par(bands) * (1.0 / len(bands))).astype(np.float32)
+        elif NUMBA_AVAILABLE:
+            powers = _band_means(bands)
+        elif len(bands) == self.window_size:
+            powers = self._avg_weights @ bands
+        else:
+            powers = bands.sum(axis=0) * (1.0 / len(bands))
+        
+        return self._build_result(powers, timestamp)
     
-    def _empty_result(self) -> Dict[str, float]:
-        """Boş sonuç döndür."""
-        return {
-            'delta_power': 0.0,
-            'theta_power': 0.0,
-            'alpha_power': 0.0,
-            'beta_power': 0.0,
-            'gamma_power': 0.0,
-            'timestamp': 0.0
-        }
+    def _build_result(self, powers: np.ndarray, timestamp: Optional[float]) -> BandPowers:
+        """Güç dizisinden BandPowers oluştur."""
+        return BandPowers(*powers.tolist(), 0.0 if timestamp is None else timestamp)
+    
+    def analyze_eeg_window_fft(self, signal: np.ndarray,
+                               timestamp: Optional[float] = None) -> BandPowers:
+        """
+        Ham EEG sinyalinden FFT ile band güçlerini hesapla.
+        
+        Args:
+            signal: window_size uzunluğunda zaman alanı sinyali,
+                    (N,) tek kanal veya (N, C) çok kanal (µV)
+            timestamp: Pencerenin zaman damgası
+            
+        Returns:
+            BandPowers: analyze_eeg_window ile aynı biçimde band güçleri
+            (band içindeki ortalama spektral güç, kanallar üzerinden).
+            Pencereye hiç frekans bini düşmeyen bandlar 0.0 döner.
+            
+        Not:
+            Gerçek cihazdan gelen ham sinyal için. scipy.fft plan
+            önbelleğini kullanır ve çok iş parçacıklı çalışır (workers=-1).
+        """
+        if len(signal) != self.window_size:
+            raise ValueError(
+                f"Sinyal uzunluğu {len(signal)}, pencere boyutu {self.window_size} olmalı"
+            )
+        
+        window = self._window if signal.ndim == 1 else self._window[:, None]
+        spec = scipy.fft.rfft(signal * window, axis=0, workers=-1)
+        psd = spec.real ** 2 + spec.imag ** 2
+        
+        # Band toplamı × 1/bin sayısı (boş bandın toplamı ve katsayısı 0)
+        channels = psd.size // len(psd)
+        sums = np.array([psd[mask].sum() for mask in self._band_masks])
+        powers = (sums * self._band_inv_counts / channels).astype(np.float32)
+        return self._build_result(powers, timestamp)
     
-    def calculate_ratios(self, band_powers: Dict[str, float]) -> Dict[str, float]:
+    def _empty_result(self) -> BandPowers:
+        """Boş sonuç döndür (paylaşılan değişmez örnek)."""
+        return _EMPTY_BP
+    
+    def calculate_ratios(self, band_powers: Union[BandPowers, Dict[str, float]]) -> Dict[str, float]:
         """
         Dalga güçlerinden oranlar hesapla.
         Bu oranlar zihin durumu tespitinde kullanılır.
@@ -82,25 +391,31 @@ class SignalProcessor:
         Örnek:
             - Beta/Alpha oranı yüksekse → Stres
             - Theta/Beta oranı yüksekse → Uykusuzluk
+        
+        Args:
+            band_powers: BandPowers veya eski sözlük biçimi (*_power anahtarları)
+        
+        Not:
+            Sonuçlar güçlerin 3 ondalığa yuvarlanmış haliyle önbelleğe
+            alınır; neredeyse aynı pencereler yeniden hesaplanmaz.
         """
-        total_power = sum([
-            band_powers['delta_power'],
-            band_powers['theta_power'],
-            band_powers['alpha_power'],
-            band_powers['beta_power'],
-            band_powers['gamma_power']
-        ])
-        
-        if total_power == 0:
+        if isinstance(band_powers, dict):
+            powers = [band_powers[band] for band in _BAND_KEYS]
+        else:
+            # BandPowers: ilk beş alan sabit band sırasında
+            powers = band_powers[:5]
+        
+        key = tuple(round(power, _RATIO_KEY_DECIMALS) for power in powers)
+        ratios = _ratios_from_powers(*key)
+        
+        if ratios is None:
             return {'beta_alpha_ratio': 0, 'theta_beta_ratio': 0}
         
-        # Güvenli bölme
-        alpha = max(band_powers['alpha_power'], 0.1)
-        beta = max(band_powers['beta_power'], 0.1)
+        beta_alpha_ratio, theta_beta_ratio, total_power = ratios
         
         return {
-            'beta_alpha_ratio': beta / alpha,
-            'theta_beta_ratio': band_powers['theta_power'] / beta,
+            'beta_alpha_ratio': beta_alpha_ratio,
+            'theta_beta_ratio': theta_beta_ratio,
             'total_power': total_power
         }
 
@@ -115,14 +430,14 @@ if __name__ == "__main__":
     simulator = EEGSimulator()
     processor = SignalProcessor()
     
-    # 2 saniyelik veri üret
-    samples = list(simulator.stream_samples(MentalStateMode.STRESSED, duration_seconds=2.0))
+    # 2 saniyelik veri üret: (512, 5) band dizisi
+    timestamps, bands = simulator.generate_batch(MentalStateMode.STRESSED, duration_seconds=2.0)
     
     # Analiz yap
-    result = processor.analyze_eeg_window(samples)
+    result = processor.analyze_eeg_window(bands, timestamp=float(timestamps[-1]))
     
     print("\n📊 Band Powers:")
-    for band, power in result.items():
+    for band, power in result.to_dict().items():
         if band != 'timestamp':
             print(f"  {band:15s}: {power:6.2f} µV")
     
@@ -130,4 +445,13 @@ if __name__ == "__main__":
     ratios = processor.calculate_ratios(result)
     print(f"\n📈 Ratios:")
     print(f"  Beta/Alpha: {ratios['beta_alpha_ratio']:.2f} (>2 = Stres işareti)")
-    print(f"  Theta/Beta: {ratios['theta_beta_ratio']:.2f} (>1 = Uykusuzluk)")
\ No newline at end of file
+    print(f"  Theta/Beta: {ratios['theta_beta_ratio']:.2f} (>1 = Uykusuzluk)")
+    
+    # FFT yolu: 10 Hz (alpha) ağırlıklı sentetik ham sinyal
+    t = np.arange(processor.window_size) / processor.sampling_rate
+    raw = 20 * np.sin(2 * np.pi * 10 * t) + np.random.normal(0, 2, t.shape)
+    fft_result = processor.analyze_eeg_window_fft(raw.astype(np.float32))
+    
+    print("\n🌊 FFT Band Powers (10 Hz sinyal):")
+    for band in _BAND_KEYS:
+        print(f"  {band:15s}: {fft_result.to_dict()[band]:12.1f}")
\ No newline at end of file